@@ -0,0 +1,72 @@
+"""Compares a chained `Query` against a hand-written comprehension calling the same
+functions, and against a nested generator-per-operator chain, as `Query` was executed
+before plans were fused.
+
+Run with `python benchmarks/fused_pipeline.py`."""
+
+from argparse import ArgumentParser
+import timeit
+
+from linq import Query
+
+
+parser = ArgumentParser(description="Benchmarks fused Query pipelines.")
+parser.add_argument("-n", type=int, default=1_000_000, help="Number of elements.")
+parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of repeats.")
+
+
+def even(x):
+    return x % 2 == 0
+
+
+def add_1(x):
+    return x + 1
+
+
+def not_divisible_by_3(x):
+    return x % 3 != 0
+
+
+def times_3(x):
+    return x * 3
+
+
+def comprehension(data):
+    return [
+        times_3(y)
+        for y in (add_1(x) for x in data if even(x))
+        if not_divisible_by_3(y)
+    ]
+
+
+def nested_generators(data):
+    q = (x for x in data)
+    q = (x for x in q if even(x))
+    q = (add_1(x) for x in q)
+    q = (x for x in q if not_divisible_by_3(x))
+    q = (times_3(x) for x in q)
+    return list(q)
+
+
+def fused_query(data):
+    return (
+        Query(data)
+        .where(even)
+        .select(add_1)
+        .where(not_divisible_by_3)
+        .select(times_3)
+        .to_list()
+    )
+
+
+def main(args):
+    data = list(range(args.n))
+    assert comprehension(data) == nested_generators(data) == fused_query(data)
+
+    for fn in (comprehension, nested_generators, fused_query):
+        best = min(timeit.repeat(lambda: fn(data), number=1, repeat=args.repeat))
+        print(f"{fn.__name__:<20}{best * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
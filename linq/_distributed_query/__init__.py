@@ -26,6 +26,7 @@ from .task_tracker import TaskTracker
 
 T = TypeVar("T")
 S = TypeVar("S")
+U = TypeVar("U")
 KT = TypeVar("KT")
 VT = TypeVar("VT")
 
@@ -38,6 +39,10 @@ def true(x):
     return True
 
 
+def pair(key, elements):
+    return key, elements
+
+
 class DistributedQuery(Generic[T]):
     """A query that distributes execution across multiple processes, allowing for
     utilization of multiple cores.
@@ -722,3 +727,44 @@ class DistributedQuery(Generic[T]):
         for x in self:
             re.update(x)
         return re
+
+    def group_by(
+        self,
+        key: Callable[[T], KT],
+        element: Callable[[T], S] = identity,
+        result: Callable[[KT, List[S]], U] = pair,
+    ) -> List[U]:
+        """Groups the elements found in the query by the given key. Each process
+        groups the elements of its chunks, after which the partial groups are merged.
+
+        Args:
+            key (Callable[[T], KT]): Callable accepting one argument, returning the
+                (hashable) key of the group the element belongs to.
+            element (Callable[[T], S], optional): Callable accepting one argument,
+                returning the value to add to the group. Defaults to the identity
+                function.
+            result (Callable[[KT, List[S]], U], optional): Callable accepting the key
+                and the list of elements of a group, returning the object to produce
+                for the group. Executed in the calling process. Defaults to returning
+                the tuple `(key, elements)`.
+
+        Returns:
+            List[U]: One object per group.
+
+        Example:
+        ```python
+        >>> def even(x):
+        >>>     return x % 2 == 0
+        >>> DistributedQuery(range(6)).group_by(even)
+        [(True, [0, 2, 4]), (False, [1, 3, 5])]  # Not necessarily in this order.
+        ```
+        """
+        self._query.set_aggregator(query.aggregators.GroupBy(key, element))
+        groups = {}
+        for partial in self:
+            for k_ey, elements in partial.items():
+                if k_ey in groups:
+                    groups[k_ey].extend(elements)
+                else:
+                    groups[k_ey] = elements
+        return [result(k_ey, elements) for k_ey, elements in groups.items()]
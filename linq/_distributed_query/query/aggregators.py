@@ -116,3 +116,20 @@ class Dict(Base):
 
     def aggregate(self, data: Iterable[_Any]) -> _Any:
         return {self.key(x): self.value(x) for x in data}
+
+
+class GroupBy(Base):
+    def __init__(self, key, element):
+        super().__init__()
+        self.key = key
+        self.element = element
+
+    def aggregate(self, data: Iterable[_Any]) -> _Any:
+        groups = {}
+        for x in data:
+            key = self.key(x)
+            if key in groups:
+                groups[key].append(self.element(x))
+            else:
+                groups[key] = [self.element(x)]
+        return groups
@@ -0,0 +1,73 @@
+from typing import Any, Dict, Generic, Iterable, List, Tuple, TypeVar
+import collections.abc
+
+
+T = TypeVar("T")
+
+
+def is_hashable(obj: Any) -> bool:
+    if not isinstance(obj, collections.abc.Hashable):
+        return False
+    try:
+        hash(obj)
+    except TypeError:
+        return False
+    return True
+
+
+class KeyIndex(Generic[T]):
+    """Multimap from keys to all values added under an equal key, in insertion order.
+
+    Keys are stored in a `dict` as long as they are hashable. If an unhashable key is
+    added, the index falls back to a list of `(key, value)` pairs compared by equality,
+    which keeps the result identical to a nested-loop lookup."""
+
+    def __init__(self, pairs: Iterable[Tuple[Any, T]] = ()):
+        self._hashed: Dict[Any, List[T]] = {}
+        self._pairs: List[Tuple[Any, T]] = None
+        for key, value in pairs:
+            self.add(key, value)
+
+    def add(self, key: Any, value: T):
+        if self._pairs is not None:
+            self._pairs.append((key, value))
+        elif is_hashable(key):
+            self._hashed.setdefault(key, []).append(value)
+        else:
+            self._pairs = [
+                (k, v) for k, values in self._hashed.items() for v in values
+            ]
+            self._pairs.append((key, value))
+            self._hashed = None
+
+    def get(self, key: Any) -> List[T]:
+        if self._pairs is not None:
+            return [v for k, v in self._pairs if k == key]
+        if is_hashable(key):
+            return self._hashed.get(key, [])
+        return [v for k, values in self._hashed.items() if k == key for v in values]
+
+
+class KeySet:
+    """Set of keys supporting membership tests. Hashable keys are stored in a `set`,
+    unhashable keys in a list which is searched by equality."""
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        self._hashed = set()
+        self._unhashed: List[Any] = []
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: Any):
+        if is_hashable(key):
+            self._hashed.add(key)
+        elif key not in self._unhashed:
+            self._unhashed.append(key)
+
+    def __contains__(self, key: Any) -> bool:
+        if is_hashable(key):
+            if key in self._hashed:
+                return True
+        elif any(k == key for k in self._hashed):
+            return True
+        return any(k == key for k in self._unhashed)
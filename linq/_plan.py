@@ -0,0 +1,88 @@
+"""Logical plans for `Query`.
+
+A query is represented by its source iterable together with a plan, i.e. a tuple of
+steps `(operator, arguments)`. Steps are only compiled into an iterator when the query
+is iterated, at which point each step is mapped onto a builtin or `itertools`
+primitive wherever possible. A chain of `where` and `select` calls hence compiles into
+nested `filter` and `map` objects, without any intermediate Python generators.
+
+Before compiling, a few steps are rewritten. An `order` step directly followed by a
+`take` step is executed as a bounded heap selection, see `TOP_K`."""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+import heapq
+import itertools
+
+
+SELECT = "select"
+WHERE = "where"
+FLATTEN = "flatten"
+TAKE = "take"
+SKIP = "skip"
+TAKE_WHILE = "take_while"
+SKIP_WHILE = "skip_while"
+ORDER = "order"
+TOP_K = "top_k"
+APPLY = "apply"
+
+Step = Tuple[str, Tuple[Any, ...]]
+Plan = Tuple[Step, ...]
+
+
+def _order(
+    iterator: Iterator[Any], value: Callable[[Any], Any], descending: bool
+) -> Iterator[Any]:
+    yield from sorted(iterator, key=value, reverse=descending)
+
+
+def _top_k(
+    iterator: Iterator[Any],
+    count: int,
+    value: Callable[[Any], Any],
+    descending: bool,
+) -> Iterator[Any]:
+    select = heapq.nlargest if descending else heapq.nsmallest
+    yield from select(max(count, 0), iterator, key=value)
+
+
+def _apply(
+    iterator: Iterator[Any], fn: Callable[[Iterator[Any]], Iterable[Any]]
+) -> Iterator[Any]:
+    return iter(fn(iterator))
+
+
+_COMPILERS: Dict[str, Callable[..., Iterator[Any]]] = {
+    SELECT: lambda iterator, transform: map(transform, iterator),
+    WHERE: lambda iterator, condition: filter(condition, iterator),
+    FLATTEN: lambda iterator: itertools.chain.from_iterable(iterator),
+    TAKE: lambda iterator, count: itertools.islice(iterator, max(count, 0)),
+    SKIP: lambda iterator, count: itertools.islice(iterator, max(count, 0), None),
+    TAKE_WHILE: lambda iterator, condition: itertools.takewhile(condition, iterator),
+    SKIP_WHILE: lambda iterator, condition: itertools.dropwhile(condition, iterator),
+    ORDER: _order,
+    TOP_K: _top_k,
+    APPLY: _apply,
+}
+
+
+def optimize(plan: Plan) -> Plan:
+    """Rewrites `order` steps directly followed by `take` into `top_k` steps."""
+    optimized = []
+    for op, args in plan:
+        if op == TAKE and optimized and optimized[-1][0] == ORDER:
+            _, (value, descending) = optimized.pop()
+            optimized.append((TOP_K, (args[0], value, descending)))
+        elif op == TAKE and optimized and optimized[-1][0] == TOP_K:
+            _, (count, value, descending) = optimized.pop()
+            optimized.append((TOP_K, (min(count, args[0]), value, descending)))
+        else:
+            optimized.append((op, args))
+    return tuple(optimized)
+
+
+def compile(iterable: Iterable[Any], plan: Plan) -> Iterator[Any]:
+    """Compiles a plan over the given source into a single iterator."""
+    iterator = iter(iterable)
+    for op, args in optimize(plan):
+        iterator = _COMPILERS[op](iterator, *args)
+    return iterator
@@ -11,9 +11,12 @@ from typing import (
     Iterator,
 )
 import collections.abc
+import itertools
 
 
 import linq
+from . import _plan as plan
+from ._hashing import KeyIndex, KeySet
 
 
 T = TypeVar("T")
@@ -25,7 +28,12 @@ V = TypeVar("V")
 
 
 class Query(Iterable[T]):
-    """The most basic query."""
+    """The most basic query.
+
+    Operators returning a new query, e.g. `select` and `where`, do not wrap the query
+    in a new generator. Instead, they record a step in a logical plan shared with the
+    source iterable. The plan is compiled into a single iterator, built from `map`,
+    `filter` and `itertools` primitives where possible, once the query is iterated."""
 
     def __init__(self, iterable: Iterable[T]):
         """
@@ -38,8 +46,18 @@ class Query(Iterable[T]):
         if not isinstance(iterable, collections.abc.Iterable):
             raise ValueError("Object is not iterable")
 
-        self._iterable: Iterable[T] = iterable
-        self._extensions: List[Iterable[T]] = []
+        steps: plan.Plan = ()
+        if isinstance(iterable, Query):
+            iterable, steps = iterable._iterable, iterable._plan
+
+        self._iterable: Iterable[Any] = iterable
+        self._plan: plan.Plan = steps
+
+    def _then(self, op: str, *args: Any) -> Query:
+        query = Query.__new__(Query)
+        query._iterable = self._iterable
+        query._plan = self._plan + ((op, args),)
+        return query
 
     def __contains__(self, obj: T) -> bool:
         for o in self:
@@ -59,12 +77,7 @@ class Query(Iterable[T]):
         return obj in self
 
     def __iter__(self) -> Iterator[T]:
-        for obj in self._iterable:
-            yield obj
-
-        for extension in self._extensions:
-            for obj in extension:
-                yield obj
+        return plan.compile(self._iterable, self._plan)
 
     def count(self, condition: Callable[[T], bool] = lambda x: True) -> int:
         """Counts the objects satisfying the condition
@@ -113,7 +126,7 @@ class Query(Iterable[T]):
         Returns:
             Query: Returns a new query builder based on the transformed objects.
         """
-        return Query(transform(x) for x in self)
+        return self._then(plan.SELECT, transform)
 
     def flatten(self) -> Query[T]:
         """Selects objects from all underlying lists into one sequence, i.e. a
@@ -124,7 +137,7 @@ class Query(Iterable[T]):
             Query: Returns a new query builder based on the flattened query.
         """
 
-        return Query(x for y in self for x in y)
+        return self._then(plan.FLATTEN)
 
     def where(self, condition: Callable[[T], bool]) -> Query[T]:
         """Filters the sequence for the given condition
@@ -137,7 +150,7 @@ class Query(Iterable[T]):
             Query: Returns a new query builder based on the filtered objects.
         """
 
-        return Query(x for x in self if condition(x))
+        return self._then(plan.WHERE, condition)
 
     def max(self) -> T:
         """Returns the maximum value found
@@ -312,17 +325,16 @@ class Query(Iterable[T]):
                 callable.
         """
 
-        cache = set()
-
-        def sequence():
-            for x in self:
+        def sequence(iterator):
+            cache = set()
+            for x in iterator:
                 if key(x) in cache:
                     continue
                 else:
                     cache.add(key(x))
                     yield x
 
-        return Query(sequence())
+        return self._then(plan.APPLY, sequence)
 
     def element_at_or_none(self, i: int) -> Optional[T]:
         """Returns the element at the given position. If there is no element at the
@@ -367,10 +379,14 @@ class Query(Iterable[T]):
     ) -> Query[T]:
         """Returns all elements found in both sequences.
 
+        The keys of `iterable` are read once into a set when the query is iterated,
+        so `iterable` may be a single-use iterable.
+
         Args:
             iterable (Iterable): The other iterable to compare to.
             key (Callable[[T], Any], optional): Expression determining value to use for
-                comparison, must be hashable. Defaults to `lambda x: x`.
+                comparison, should be hashable. Unhashable values are compared by
+                equality instead. Defaults to `lambda x: x`.
 
         Raises:
             ValueError: If the given iterable is not Iterable
@@ -382,13 +398,88 @@ class Query(Iterable[T]):
         if not isinstance(iterable, collections.abc.Iterable):
             raise ValueError("Object is not iterable")
 
-        def sequence():
-            for x in self:
-                kx = key(x)
-                if Query(iterable).any(lambda y: kx == key(y)):
+        def sequence(iterator):
+            keys = KeySet(key(y) for y in iterable)
+            for x in iterator:
+                if key(x) in keys:
+                    yield x
+
+        return self._then(plan.APPLY, sequence)
+
+    def except_(
+        self, iterable: Iterable[T], key: Callable[[T], Any] = lambda x: x
+    ) -> Query[T]:
+        """Returns all elements not found in the other sequence, i.e. the set
+        difference.
+
+        The keys of `iterable` are read once into a set when the query is iterated,
+        so `iterable` may be a single-use iterable.
+
+        Args:
+            iterable (Iterable): The sequence of elements to exclude.
+            key (Callable[[T], Any], optional): Expression determining value to use for
+                comparison, should be hashable. Unhashable values are compared by
+                equality instead. Defaults to `lambda x: x`.
+
+        Raises:
+            ValueError: If the given iterable is not Iterable
+
+        Returns:
+            Query: Query builder on the elements of self not found in the given
+                iterable.
+        """
+
+        if not isinstance(iterable, collections.abc.Iterable):
+            raise ValueError("Object is not iterable")
+
+        def sequence(iterator):
+            keys = KeySet(key(y) for y in iterable)
+            for x in iterator:
+                if key(x) not in keys:
+                    yield x
+
+        return self._then(plan.APPLY, sequence)
+
+    difference = except_
+
+    def symmetric_difference(
+        self, iterable: Iterable[T], key: Callable[[T], Any] = lambda x: x
+    ) -> Query[T]:
+        """Returns all elements found in exactly one of the two sequences. Elements of
+        this query come first, followed by the elements of `iterable`.
+
+        Both sequences are read once when the query is iterated.
+
+        Args:
+            iterable (Iterable): The other iterable to compare to.
+            key (Callable[[T], Any], optional): Expression determining value to use for
+                comparison, should be hashable. Unhashable values are compared by
+                equality instead. Defaults to `lambda x: x`.
+
+        Raises:
+            ValueError: If the given iterable is not Iterable
+
+        Returns:
+            Query: Query builder on the symmetric difference of self and the given
+                iterable.
+        """
+
+        if not isinstance(iterable, collections.abc.Iterable):
+            raise ValueError("Object is not iterable")
+
+        def sequence(iterator):
+            inner = [(key(x), x) for x in iterator]
+            outer = [(key(y), y) for y in iterable]
+            inner_keys = KeySet(k for k, _ in inner)
+            outer_keys = KeySet(k for k, _ in outer)
+            for k, x in inner:
+                if k not in outer_keys:
                     yield x
+            for k, y in outer:
+                if k not in inner_keys:
+                    yield y
 
-        return Query(sequence())
+        return self._then(plan.APPLY, sequence)
 
     def to_list(self) -> List[T]:
         """Returns the sequence as a list.
@@ -409,6 +500,13 @@ class Query(Iterable[T]):
         keys and yields a new sequence of objects according to the transform specified.
         Equivalent to INNER JOIN in SQL.
 
+        The join is executed as a hash join. When the query is iterated, `extension`
+        is read once into an index on `outerKey`, after which the query is streamed
+        through and each element is matched against the index. Hence, `extension` may
+        be a single-use iterable, e.g. a generator, as long as the joined query is
+        iterated only once. Keys should be hashable; if they are not, matching falls
+        back to equality comparisons.
+
         Args:
             extension (Iterable): The sequence to join into the query.
             innerKey (Callable[[T], Any]): Expression determining which key to join on
@@ -428,13 +526,13 @@ class Query(Iterable[T]):
         if not isinstance(extension, collections.abc.Iterable):
             raise ValueError("Object is not iterable")
 
-        def sequence():
-            for x in self:
-                outerObjs = Query(extension).where(lambda y: innerKey(x) == outerKey(y))
-                for outerObj in outerObjs:
+        def sequence(iterator):
+            index = KeyIndex((outerKey(y), y) for y in extension)
+            for x in iterator:
+                for outerObj in index.get(innerKey(x)):
                     yield transform(x, outerObj)
 
-        return Query(sequence())
+        return self._then(plan.APPLY, sequence)
 
     def take(self, count: int) -> Query[T]:
         """Selects the first `n` elements from the query.
@@ -446,13 +544,7 @@ class Query(Iterable[T]):
             Query: Query builder object wrapping the selected elements.
         """
 
-        def sequence():
-            for n, x in enumerate(self):
-                if n >= count:
-                    break
-                yield x
-
-        return Query(sequence())
+        return self._then(plan.TAKE, count)
 
     def take_while(self, condition: Callable[[T], bool]) -> Query[T]:
         """Selects elements as long as the condition is fulfilled.
@@ -464,14 +556,7 @@ class Query(Iterable[T]):
             Query: Query builder object wrapping the selected elements.
         """
 
-        def sequence():
-            for x in self:
-                if condition(x):
-                    yield x
-                else:
-                    break
-
-        return Query(sequence())
+        return self._then(plan.TAKE_WHILE, condition)
 
     def order(
         self, value: Callable[[T], Any] = lambda x: x, descending=False
@@ -488,10 +573,30 @@ class Query(Iterable[T]):
             Query: Query builder object wrapping the sorted sequence
         """
 
-        def sequence():
-            yield from sorted(self, key=value, reverse=descending)
+        return self._then(plan.ORDER, value, descending)
+
+    def top_k(
+        self, count: int, value: Callable[[T], Any] = lambda x: x, descending=False
+    ) -> Query[T]:
+        """Selects the first `count` elements of the sequence ordered with respect to
+        the given key, i.e. equivalent to `order(value, descending).take(count)`.
+
+        The elements are selected using a bounded heap, thus requiring `O(n log k)`
+        time and `O(k)` memory, rather than sorting the full sequence. Note that
+        `order(...).take(...)` is executed in the same manner.
+
+        Args:
+            count (int): The number of elements to select.
+            value (Callable[[T], Any], optional): Expression determining which value to
+                sort on. Defaults to `lambda x: x`.
+            descending (bool, optional): Whether or not to select the largest elements,
+                in descending order. Defaults to `False`.
+
+        Returns:
+            Query: Query builder object wrapping the selected elements, in order.
+        """
 
-        return Query(sequence())
+        return self._then(plan.TOP_K, count, value, descending)
 
     def skip(self, count: int) -> Query[T]:
         """Skips the first elements in the sequence.
@@ -503,16 +608,7 @@ class Query(Iterable[T]):
             Query: Query builder wrapping the remaining elements.
         """
 
-        def sequence():
-            i = 0
-            for obj in self:
-                if i < count:
-                    i += 1
-                    continue
-
-                yield obj
-
-        return Query(sequence())
+        return self._then(plan.SKIP, count)
 
     def skip_while(self, condition: Callable[[T], bool]) -> Query[T]:
         """Skips the first elements in the sequence while the condition is fulfilled.
@@ -525,17 +621,7 @@ class Query(Iterable[T]):
             Query: The remaining elements wrapped in a query builder object.
         """
 
-        def sequence():
-            skipping = True
-            for obj in self:
-                if skipping:
-                    if condition(obj):
-                        continue
-                    else:
-                        skipping = False
-                yield obj
-
-        return Query(sequence())
+        return self._then(plan.SKIP_WHILE, condition)
 
     def to_dict(
         self, key: Callable[[T], KT], value: Callable[[T], VT] = lambda x: x
@@ -565,6 +651,56 @@ class Query(Iterable[T]):
 
         return re
 
+    def group_by(
+        self,
+        key: Callable[[T], KT],
+        element: Callable[[T], S] = lambda x: x,
+        result: Callable[[KT, Iterable[S]], U] = lambda key, elements: (key, elements),
+        sorted: bool = False,
+    ) -> Query[U]:
+        """Groups the elements of the sequence by the given key.
+
+        By default, elements are grouped using a dictionary, i.e. the full sequence is
+        read before the first group is yielded. Groups are yielded in the order their
+        keys are first encountered, with elements in their original order. If the
+        sequence is known to be ordered by the key, `sorted=True` streams the groups
+        instead, grouping consecutive elements with equal keys using only constant
+        extra memory (see `itertools.groupby`).
+
+        Args:
+            key (Callable[[T], KT]): Expression determining the key of each element.
+                Must be hashable, unless `sorted=True`.
+            element (Callable[[T], S], optional): Expression describing the value of
+                the elements before added to their group. Defaults to `lambda x: x`.
+            result (Callable[[KT, Iterable[S]], U], optional): Expression taking the
+                key and the elements of a group, returning the object to yield for the
+                group. Defaults to returning the tuple `(key, elements)`.
+            sorted (bool, optional): Whether or not the sequence is ordered by the key.
+                If `True`, the elements passed to `result` are given as an iterator,
+                which is only valid until the next group is retrieved. Otherwise, they
+                are given as a list. Defaults to `False`.
+
+        Returns:
+            Query: Query builder object wrapping one object per group.
+        """
+
+        def hashed(iterator):
+            groups: Dict[KT, List[S]] = {}
+            for x in iterator:
+                k_ey = key(x)
+                if k_ey in groups:
+                    groups[k_ey].append(element(x))
+                else:
+                    groups[k_ey] = [element(x)]
+            for k_ey, elements in groups.items():
+                yield result(k_ey, elements)
+
+        def streamed(iterator):
+            for k_ey, group in itertools.groupby(iterator, key):
+                yield result(k_ey, map(element, group))
+
+        return self._then(plan.APPLY, streamed if sorted else hashed)
+
     def union(
         self, outer: Iterable[T], value: Callable[[T], Any] = lambda x: x
     ) -> Query[T]:
@@ -587,10 +723,9 @@ class Query(Iterable[T]):
         if not isinstance(outer, collections.abc.Iterable):
             raise ValueError("Object is not iterable")
 
-        cache = set()
-
-        def sequence():
-            for x in self:
+        def sequence(iterator):
+            cache = set()
+            for x in iterator:
                 if value(x) in cache:
                     continue
                 else:
@@ -604,4 +739,4 @@ class Query(Iterable[T]):
                     cache.add(value(x))
                     yield x
 
-        return Query(sequence())
+        return self._then(plan.APPLY, sequence)
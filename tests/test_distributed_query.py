@@ -197,3 +197,16 @@ def test_to_dict():
     dict_ = DistributedQuery(range(100), processes=2).to_dict(str, square)
     assert set(dict_.keys()) == {str(x) for x in range(100)}
     assert set(dict_.values()) == {x ** 2 for x in range(100)}
+
+
+def even(x):
+    return x % 2 == 0
+
+
+def test_group_by():
+    groups = DistributedQuery(range(100), processes=2, chunk_size=7).group_by(
+        even, square
+    )
+    assert len(groups) == 2
+    for key, elements in groups:
+        assert sorted(elements) == [x ** 2 for x in range(100) if even(x) == key]
@@ -315,6 +315,45 @@ class TestBasicFunctions(unittest.TestCase):
             [4]
         )
 
+        self.assertListEqual(
+            Query([1, 2, 3, 4]).intersect(x for x in [3, 4, 5, 6]).to_list(),
+            [3, 4]
+        )
+
+        self.assertListEqual(
+            Query([[1], [2], [3]]).intersect([[3], [1]]).to_list(),
+            [[1], [3]]
+        )
+
+    def test_except(self):
+        self.assertListEqual(
+            Query([1, 2, 3, 4]).except_(x for x in [3, 4, 5, 6]).to_list(),
+            [1, 2]
+        )
+
+        self.assertListEqual(
+            Query([1, 2, 3, 4]).difference([5, 6], key=lambda x: x % 4).to_list(),
+            [3, 4]
+        )
+
+        self.assertListEqual(
+            Query([[1], [2], [3]]).except_([[3], [1]]).to_list(),
+            [[2]]
+        )
+
+    def test_symmetric_difference(self):
+        self.assertListEqual(
+            Query(x for x in [1, 2, 3, 4]).symmetric_difference(
+                x for x in [3, 4, 5, 6]
+            ).to_list(),
+            [1, 2, 5, 6]
+        )
+
+        self.assertListEqual(
+            Query([1, 2, 3]).symmetric_difference([4, 5], key=lambda x: x % 3).to_list(),
+            [3]
+        )
+
     def test_last(self):
         subject = [1, 2, 3, 4]
         self.assertEqual(
@@ -622,6 +661,27 @@ class TestBasicFunctions(unittest.TestCase):
         ]
         self.assertListEqual(expected, result)
 
+    def test_join_hash(self):
+        self.assertListEqual(
+            Query([1, 2, 3, 2]).join(
+                (x for x in [2, 3, 2, 4]),
+                lambda x: x,
+                lambda x: x,
+                lambda x, y: (x, y)
+            ).to_list(),
+            [(2, 2), (2, 2), (3, 3), (2, 2), (2, 2)]
+        )
+
+        self.assertListEqual(
+            Query([[1], [2]]).join(
+                [[2], [1], [1]],
+                lambda x: x,
+                lambda x: x,
+                lambda x, y: x[0] + y[0]
+            ).to_list(),
+            [2, 2, 4]
+        )
+
     def test_take(self):
         self.assertListEqual(
             Query([1, 2, 3]).take(2).to_list(),
@@ -650,6 +710,54 @@ class TestBasicFunctions(unittest.TestCase):
             [3, 6, 1, 4, 7, 2, 5]
         )
 
+    def test_top_k(self):
+        self.assertListEqual(
+            Query([1, 2, 4, 3, 7, 6, 5]).top_k(3).to_list(),
+            [1, 2, 3]
+        )
+
+        self.assertListEqual(
+            Query([1, 2, 4, 3, 7, 6, 5]).top_k(3, descending=True).to_list(),
+            [7, 6, 5]
+        )
+
+        self.assertListEqual(
+            Query([1, 2, 4, 3, 7, 6, 5]).order(value=lambda x: x % 3).take(4).to_list(),
+            [3, 6, 1, 4]
+        )
+
+        self.assertListEqual(
+            Query(x for x in [1, 2, 4, 3, 7, 6, 5]).order(lambda x: x % 3, True).take(3).to_list(),
+            [2, 5, 1]
+        )
+
+        self.assertListEqual(Query([2, 1]).top_k(5).take(1).to_list(), [1])
+        self.assertListEqual(Query([2, 1]).top_k(-1).to_list(), [])
+
+    def test_group_by(self):
+        self.assertListEqual(
+            Query([1, 2, 3, 4, 5]).group_by(lambda x: x % 2).to_list(),
+            [(1, [1, 3, 5]), (0, [2, 4])]
+        )
+
+        self.assertListEqual(
+            Query([1, 2, 3, 4, 5]).group_by(
+                lambda x: x % 2,
+                element=lambda x: x * x,
+                result=lambda key, elements: {"key": key, "sum": sum(elements)}
+            ).to_list(),
+            [{"key": 1, "sum": 35}, {"key": 0, "sum": 20}]
+        )
+
+        self.assertListEqual(
+            Query(x for x in [1, 1, 2, 3, 3, 1]).group_by(
+                lambda x: x,
+                result=lambda key, elements: (key, list(elements)),
+                sorted=True
+            ).to_list(),
+            [(1, [1, 1]), (2, [2]), (3, [3, 3]), (1, [1])]
+        )
+
     def test_union(self):
         self.assertListEqual(
             Query([1, 2, 3]).union([3, 4, 5]).to_list(),
@@ -675,6 +783,19 @@ class TestBasicFunctions(unittest.TestCase):
 
         self.assertTrue(True)
 
+    def test_plan(self):
+        query = Query([1, 2, 2, 3, 4, 5, 6]).where(lambda x: x > 1).distinct().skip(1)
+        self.assertListEqual(query.to_list(), [3, 4, 5, 6])
+        self.assertListEqual(query.to_list(), [3, 4, 5, 6])
+
+        self.assertListEqual(
+            Query(query).select(lambda x: x * 2).take(2).to_list(),
+            [6, 8]
+        )
+
+        self.assertListEqual(Query([1, 2]).skip(-1).to_list(), [1, 2])
+        self.assertListEqual(Query([1, 2]).take(-1).to_list(), [])
+
     def test_skip(self):
         self.assertListEqual(
             Query([1,2,3,4,5,6,7]).skip(3).to_list(),